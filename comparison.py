@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class ComparisonBuffers():
+    """
+    Buffers NumPy compartilhados para comparar várias execuções lado a lado.
+
+    Cada execução ocupa uma linha de ck/vm (shape (capacidade, K_max)); o
+    restante da linha fica NaN. As métricas são calculadas de uma vez sobre
+    todas as linhas.
+    """
+
+    def __init__(self, capacity: int = 8, K: int = 1000):
+        self.n = 0
+        self.labels = []
+        self.lengths = np.zeros(capacity, dtype=int)
+        self.sp = np.zeros(capacity)
+        self.pv0 = np.zeros(capacity)
+        self.ts = np.ones(capacity)
+        self.ck = np.full((capacity, K), np.nan)
+        self.vm = np.full((capacity, K), np.nan)
+
+
+
+    def _grow(self, rows: int, cols: int) -> None:
+        cap, K = self.ck.shape
+        new_cap = max(cap, rows)
+        new_K = max(K, cols)
+        if new_cap == cap and new_K == K:
+            return
+        if new_cap > cap:
+            new_cap = max(new_cap, 2 * cap)
+
+        for name in ("ck", "vm"):
+            old = getattr(self, name)
+            buf = np.full((new_cap, new_K), np.nan)
+            buf[:cap, :K] = old
+            setattr(self, name, buf)
+        for name, fill in (("lengths", 0), ("sp", 0.0), ("pv0", 0.0), ("ts", 1.0)):
+            old = getattr(self, name)
+            buf = np.full(new_cap, fill, dtype=old.dtype)
+            buf[:cap] = old
+            setattr(self, name, buf)
+
+
+
+    def add(self, label: str, traj: dict, sp: float, pv0: float, ts: float) -> int:
+        """Copia ck/vm de uma execução (arrays ou memmaps do cache) e retorna o índice."""
+        K = len(traj["ck"])
+        self._grow(self.n + 1, K)
+        i = self.n
+        self.ck[i, :K] = traj["ck"]
+        self.vm[i, :K] = traj["vm"]
+        self.lengths[i] = K
+        self.sp[i] = sp
+        self.pv0[i] = pv0
+        self.ts[i] = ts
+        self.labels.append(label)
+        self.n += 1
+        return i
+
+
+
+    def clear(self) -> None:
+        self.ck[:self.n] = np.nan
+        self.vm[:self.n] = np.nan
+        self.lengths[:self.n] = 0
+        self.labels.clear()
+        self.n = 0
+
+
+
+    def metrics(self, band: float = 0.02) -> dict:
+        return step_metrics(self.ck[:self.n], self.sp[:self.n], self.pv0[:self.n],
+                            self.ts[:self.n], band=band)
+
+
+
+def step_metrics(ck: np.ndarray, sp, pv0, ts, band: float = 0.02) -> dict:
+    """
+    IAE, sobressinal (%) e tempo de acomodação (s) para várias execuções.
+
+    ck: (n_execucoes, K), NaN após o fim de cada execução.
+    sp, pv0, ts: escalares ou arrays (n_execucoes,).
+    band: faixa de acomodação relativa ao degrau |sp - pv0| (2% por padrão).
+    """
+    ck = np.atleast_2d(ck)
+    n, K = ck.shape
+    sp = np.broadcast_to(np.asarray(sp, dtype=float), (n,))[:, None]
+    pv0 = np.broadcast_to(np.asarray(pv0, dtype=float), (n,))[:, None]
+    ts = np.broadcast_to(np.asarray(ts, dtype=float), (n,))
+
+    err = sp - ck
+    valid = ~np.isnan(ck)
+    iae = np.nansum(np.abs(err), axis=1) * ts
+
+    step = np.abs(sp - pv0)[:, 0]
+    direction = np.sign(sp - pv0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        peak = np.nanmax(np.where(valid, direction * (ck - sp), -np.inf), axis=1)
+        overshoot = np.where(step > 0.0, np.maximum(peak, 0.0) / step * 100.0, np.nan)
+
+    # último passo fora da faixa; acomodado se ele não for o último amostrado
+    outside = valid & (np.abs(err) > (band * step)[:, None])
+    lengths = valid.sum(axis=1)
+    last_out = np.where(outside.any(axis=1), K - 1 - outside[:, ::-1].argmax(axis=1), -1)
+    settled = (last_out + 1) < lengths
+    settling = np.where(settled & (step > 0.0), (last_out + 1) * ts, np.nan)
+
+    return {"iae": iae, "overshoot": overshoot, "settling_time": settling}
+
+
+
+def decimate(y: np.ndarray, max_points: int = 2000):
+    """
+    Decimação min/max por blocos (mantém picos e vales visíveis no gráfico).
+    Retorna (índices, valores) com no máximo ~max_points pontos.
+    """
+    y = np.asarray(y)
+    n = y.shape[0]
+    if n <= max_points:
+        return np.arange(n), y
+
+    bucket = int(np.ceil(n / (max_points // 2)))
+    nb = n // bucket
+    head = y[:nb * bucket].reshape(nb, bucket)
+    base = np.arange(nb) * bucket
+    i_min = base + np.argmin(head, axis=1)
+    i_max = base + np.argmax(head, axis=1)
+
+    idx = np.sort(np.concatenate([i_min, i_max, np.arange(nb * bucket, n)]))
+    return idx, y[idx]
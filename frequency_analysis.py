@@ -0,0 +1,310 @@
+"""
+Análise em frequência da malha fechada do GenericControler (PID incremental + planta).
+
+Malha aberta discreta, na mesma convenção do ctrl() (e(k) usa pv = C(k-1) e o
+buffer de tempo morto entrega m(k-eta+1) ao modelo):
+
+    C(z) = s * (a0 + a1 z^-1 + a2 z^-2) / (1 - z^-1)       s = action_dir
+    G(z) = z^-eta * N(z^-1) / D(z^-1)
+    L(z) = C(z) G(z)
+
+No FOPDT padrão N = [a_n] e D = [1, -b_1]; com "modelo" nas definições, N/D vêm
+do PlantModel linear (TransferFunction.num/den ou conversão do StateSpace).
+
+Polinômio característico (1 + L = 0) em z^-1:
+
+    (1 - z^-1) D(z^-1) + s z^-eta (a0 + a1 z^-1 + a2 z^-2) N(z^-1) = 0
+
+Todas as funções aceitam escalares ou arrays (uma sintonia por posição) e
+calculam tudo em lote: shape (n_sintonias, n_freq). A grade de frequências é
+normalizada, theta = w*T em (theta_min, pi], a mesma para todas as linhas;
+assim cada sintonia vai até o próprio Nyquist e w = theta / T por linha.
+"""
+
+import numpy as np
+
+from plant_models import StateSpace, TransferFunction, base_model, build_plant_model
+
+
+# chaves de não-linearidade do build_plant_model (fora do alcance da análise linear)
+NONLINEAR_KEYS = ("u_min", "u_max", "taxa_max")
+
+# |a0 + a1 + a2| relativo abaixo do qual não há ação integral (fator (1 - z^-1) cancela)
+CANCEL_TOL = 1e-9
+
+# raio espectral até MARGINAL_TOL de 1: marginalmente estável
+MARGINAL_TOL = 1e-6
+
+
+
+def pid_coefficients(kp, ki, kd, T):
+    """a0, a1, a2 como no ctrl() (T/Ti = 0 quando não há ação integral)."""
+    kp, ki, kd, T = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in (kp, ki, kd, T)))
+    pos = kp > 0.0
+    safe_kp = np.where(pos, kp, 1.0)
+    Ti = np.where(pos & (ki > 0.0), kp / np.where(ki > 0.0, ki, 1.0), 0.0)
+    Td = np.where(pos & (kd > 0.0), kd / safe_kp, 0.0)
+    T_Ti = np.where(Ti > 0.0, T / np.where(Ti > 0.0, Ti, 1.0), 0.0)
+
+    a0 = np.where((Ti > 0.0) | (Td > 0.0), kp * (1.0 + T_Ti + Td / T), kp)
+    a1 = np.where(T > 0.0, -kp * (1.0 + 2.0 * Td / T), 0.0)
+    a2 = np.where(T > 0.0, kp * Td / T, 0.0)
+    return a0, a1, a2
+
+
+
+def plant_coefficients(k, j, tm, T):
+    """a_n, b_1 e eta = 1 + floor(tm/T) como no ctrl()."""
+    k, j, tm, T = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in (k, j, tm, T)))
+    b_1 = np.exp(-T / j)
+    a_n = k * (1.0 - b_1)
+    eta = dead_time_steps(tm, T)
+    return a_n, b_1, eta
+
+
+
+def dead_time_steps(tm, T):
+    """eta = 1 + floor(tm/T) (>= 1), como o _update_eta() do controlador."""
+    tm, T = np.broadcast_arrays(np.atleast_1d(np.asarray(tm, dtype=float)), np.atleast_1d(np.asarray(T, dtype=float)))
+    return np.maximum(1, 1 + np.floor(tm / T).astype(int))
+
+
+
+def plant_polynomials(model) -> tuple:
+    """
+    (N, D) em z^-1 de um PlantModel linear, com D[0] = 1.
+    Saturation/RateLimit são recusados: a análise é linear.
+    """
+    if base_model(model) is not model:
+        raise ValueError("Análise em frequência não se aplica a modelos com saturação/limite de taxa")
+    if isinstance(model, TransferFunction):
+        return np.asarray(model.num, dtype=float), np.asarray(model.den, dtype=float)
+    if isinstance(model, StateSpace):
+        # H(z) = C (zI - A)^-1 B + D  ->  N = det(zI - A + B C) - det(zI - A) + D det(zI - A)
+        den = np.poly(model.A)
+        num = np.poly(model.A - np.outer(model.B, model.C)) - den + model.D * den
+        return num, den
+    raise ValueError(f"Modelo sem forma linear conhecida: {type(model).__name__}")
+
+
+
+def _poly_rows(p, n):
+    """Polinômios (1D compartilhado ou 2D por linha) -> array (n, grau+1)."""
+    p = np.asarray(p, dtype=float)
+    return np.broadcast_to(p if p.ndim == 2 else p[None, :], (n, p.shape[-1]))
+
+
+
+def open_loop_response(a0, a1, a2, num, den, eta, theta, action_dir=1):
+    """
+    L(e^{j theta}) com shape (n_sintonias, len(theta)); theta = w*T normalizado.
+    num/den em z^-1, 1D (mesma planta para todas) ou 2D (uma por linha).
+    """
+    a0, a1, a2, eta, s = (np.atleast_1d(np.asarray(v))
+                          for v in np.broadcast_arrays(a0, a1, a2, eta, action_dir))
+    n = a0.shape[0]
+    num = _poly_rows(num, n)
+    den = _poly_rows(den, n)
+
+    zi = np.exp(-1j * np.asarray(theta, dtype=float))[None, :]    # z^-1
+    N = num @ (zi ** np.arange(num.shape[1])[:, None])
+    D = den @ (zi ** np.arange(den.shape[1])[:, None])
+
+    ctrl = s[:, None] * (a0[:, None] + a1[:, None] * zi + a2[:, None] * zi ** 2) / (1.0 - zi)
+    plant = zi ** eta[:, None] * N / D
+    return ctrl * plant
+
+
+
+def has_integral(a0, a1, a2):
+    """False quando a0 + a1 + a2 = 0 (sem ação integral), com tolerância relativa."""
+    a0, a1, a2 = (np.asarray(v, dtype=float) for v in (a0, a1, a2))
+    return np.abs(a0 + a1 + a2) > CANCEL_TOL * (np.abs(a0) + np.abs(a1) + np.abs(a2))
+
+
+
+def closed_loop_poles(a0, a1, a2, num, den, eta, action_dir=1):
+    """
+    Polos de malha fechada via autovalores das matrizes companheiras, em lote
+    por valor de eta. Retorna (n, grau_max) preenchido com NaN.
+
+    Sem ação integral (a0 + a1 + a2 = 0) o PID incremental tem o fator
+    (1 - z^-1) em comum com o integrador da forma velocidade; ele é cancelado
+    antes do cálculo (o polo em z = 1 só mantém o offset, não é instabilidade).
+    """
+    a0, a1, a2, eta, s = (np.atleast_1d(np.asarray(v, dtype=float))
+                          for v in np.broadcast_arrays(a0, a1, a2, eta, action_dir))
+    eta = eta.astype(int)
+    n = a0.shape[0]
+    num = _poly_rows(num, n)
+    den = _poly_rows(den, n)
+    nn, nd = num.shape[1], den.shape[1]
+
+    # a0 + a1 z^-1 + a2 z^-2 = (1 - z^-1)(a0 - a2 z^-1) quando a soma é nula
+    cancel = ~has_integral(a0, a1, a2)
+    c0 = a0
+    c1 = np.where(cancel, -a2, a1)
+    c2 = np.where(cancel, 0.0, a2)
+
+    width = max(nd + 1, int(eta.max()) + nn + 2)
+    poles = np.full((n, width - 1), np.nan, dtype=complex)
+
+    for e in np.unique(eta):
+        for canceled in (False, True):
+            idx = np.nonzero((eta == e) & (cancel == canceled))[0]
+            if idx.size == 0:
+                continue
+            P = np.zeros((idx.size, max(nd + 1, e + nn + 2)))
+
+            # (1 - z^-1) D, ou só D com o fator cancelado
+            P[:, :nd] += den[idx]
+            if not canceled:
+                P[:, 1:nd + 1] -= den[idx]
+
+            # s z^-eta (c0 + c1 z^-1 + c2 z^-2) N
+            g = s[idx, None] * num[idx]
+            for i, c in enumerate((c0, c1, c2)):
+                P[:, e + i:e + i + nn] += c[idx, None] * g
+
+            # colunas finais nulas em todo o grupo só acrescentariam polos em z = 0
+            nz = np.nonzero(np.any(P != 0.0, axis=0))[0]
+            P = P[:, :nz[-1] + 1]
+            deg = P.shape[1] - 1
+            if deg == 0:
+                continue
+
+            # em z^-1 ascendente = em z descendente; P[:, 0] = D[0] = 1 (mônico)
+            comp = np.zeros((idx.size, deg, deg))
+            comp[:, 0, :] = -P[:, 1:] / P[:, :1]
+            comp[:, np.arange(1, deg), np.arange(deg - 1)] = 1.0
+            poles[idx, :deg] = np.linalg.eigvals(comp)
+
+    return poles
+
+
+
+def _first_crossing(x, y, level):
+    """Primeiro cruzamento de y por level ao longo do último eixo (interp. em x)."""
+    d = y - level
+    cross = (d[:, :-1] * d[:, 1:]) <= 0.0
+    found = cross.any(axis=1)
+    i = cross.argmax(axis=1)[:, None]
+
+    x0 = np.take_along_axis(x, i, axis=1)[:, 0]
+    x1 = np.take_along_axis(x, i + 1, axis=1)[:, 0]
+    d0 = np.take_along_axis(d, i, axis=1)[:, 0]
+    d1 = np.take_along_axis(d, i + 1, axis=1)[:, 0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(d1 != d0, d0 / (d0 - d1), 0.0)
+    return np.where(found, x0 + frac * (x1 - x0), np.nan), i[:, 0], found
+
+
+
+def analyze(kp, ki, kd, k, j, tm, ts, acao="inversa", n_freq=512, theta_min=None, plant=None):
+    """
+    Margens de ganho/fase, banda passante e polos para uma ou várias sintonias.
+
+    acao segue o controlador: "direta" -> action_dir = -1, senão +1.
+    plant: PlantModel linear (discretizado com o mesmo ts) no lugar do FOPDT de
+    k/j; o tempo morto continua vindo de tm.
+    Frequências em rad/s por linha (w = theta / ts); margens valem NaN/inf
+    quando não há cruzamento até o Nyquist da própria sintonia.
+    """
+    acao = np.atleast_1d(np.asarray(acao))
+    action_dir = np.where(acao == "direta", -1, 1)
+
+    a0, a1, a2 = pid_coefficients(kp, ki, kd, ts)
+    if plant is None:
+        a_n, b_1, eta = plant_coefficients(k, j, tm, ts)
+        num = a_n[:, None]
+        den = np.stack([np.ones_like(b_1), -b_1], axis=1)
+    else:
+        num, den = plant_polynomials(plant)
+        eta = dead_time_steps(tm, ts)
+    a0, a1, a2, eta, T, action_dir = np.broadcast_arrays(
+        a0, a1, a2, eta, np.atleast_1d(np.asarray(ts, dtype=float)), action_dir)
+    n = a0.shape[0]
+    num = _poly_rows(num, n)
+    den = _poly_rows(den, n)
+
+    # grade normalizada theta = wT, igual para todas as linhas (cada uma até o seu Nyquist)
+    if theta_min is None:
+        theta_min = np.pi * 1e-4
+    theta = np.logspace(np.log10(theta_min), np.log10(np.pi), n_freq)
+    log_theta = np.broadcast_to(np.log10(theta), (n, n_freq))
+    w = theta[None, :] / T[:, None]
+
+    L = open_loop_response(a0, a1, a2, num, den, eta, theta, action_dir)
+    mag = np.abs(L)
+    phase = np.degrees(np.unwrap(np.angle(L), axis=1))
+
+    # margem de fase: |L| = 1
+    thc_log, ic, has_wc = _first_crossing(log_theta, 20.0 * np.log10(mag), 0.0)
+    wc = 10.0 ** thc_log / T
+    ph_c = np.take_along_axis(phase, ic[:, None], axis=1)[:, 0]
+    pm = np.where(has_wc, 180.0 + ph_c, np.inf)
+
+    # margem de ganho: fase = -180
+    th180_log, i180, has_180 = _first_crossing(log_theta, phase, -180.0)
+    w180 = 10.0 ** th180_log / T
+    mag_180 = np.take_along_axis(mag, i180[:, None], axis=1)[:, 0]
+    gm_db = np.where(has_180, -20.0 * np.log10(mag_180), np.inf)
+
+    # banda passante de malha fechada (-3 dB em relação à baixa frequência)
+    Tcl = np.abs(L / (1.0 + L))
+    thbw_log, _, _ = _first_crossing(log_theta, 20.0 * np.log10(Tcl / Tcl[:, :1]), -3.0103)
+    bandwidth = 10.0 ** thbw_log / T
+
+    poles = closed_loop_poles(a0, a1, a2, num, den, eta, action_dir)
+    with np.errstate(invalid="ignore"):
+        radius = np.nanmax(np.abs(poles), axis=1)
+    radius = np.where(np.isnan(radius), 0.0, radius)
+    marginal = np.abs(radius - 1.0) <= MARGINAL_TOL
+
+    return {
+        "theta": theta,
+        "w": w,
+        "L": L,
+        "mag_db": 20.0 * np.log10(mag),
+        "phase_deg": phase,
+        "a0": a0, "a1": a1, "a2": a2,
+        "num": num, "den": den, "eta": eta,
+        "wc": wc,
+        "pm_deg": pm,
+        "w180": w180,
+        "gm_db": gm_db,
+        "bandwidth": bandwidth,
+        "poles": poles,
+        "spectral_radius": radius,
+        "stable": radius < 1.0 - MARGINAL_TOL,
+        "marginal": marginal,
+        "integral": has_integral(a0, a1, a2),
+    }
+
+
+
+def analyze_defs(controler_definitions: dict, n_freq=512) -> dict:
+    """
+    Atalho para o dict de definições do GenericControler (acao "direta"/"inversa").
+    Respeita "modelo"/wn/zeta via build_plant_model; recusa (ValueError) o modo
+    manual (malha aberta) e as chaves de não-linearidade, que a análise linear
+    não representa.
+    """
+    d = controler_definitions
+    if str(d.get("modo", "manual")) != "automatico":
+        raise ValueError("Análise em frequência só vale em modo automático (em manual a malha está aberta)")
+
+    nonlinear = [key for key in NONLINEAR_KEYS if d.get(key) is not None]
+    if nonlinear:
+        raise ValueError(f"Análise em frequência não se aplica com não-linearidades: {', '.join(nonlinear)}")
+
+    ts = float(d.get("ts", 1.0))
+    plant = None
+    if str(d.get("modelo", "primeira_ordem")) != "primeira_ordem":
+        plant = build_plant_model(d, ts)
+
+    return analyze(
+        d.get("kp", 0.0), d.get("ki", 0.0), d.get("kd", 0.0),
+        d.get("k", 0.0), d.get("j", 0.0), d.get("tm", 0.0), ts,
+        acao=d.get("acao", "direta"), n_freq=n_freq, plant=plant,
+    )
@@ -2,13 +2,17 @@ import time
 import math
 from collections import deque
 
+from plant_models import PlantModel, base_model, build_plant_model
+from telemetry import Telemetry, bind_hooks
+
 
 class GenericControler():
     """
     Controler class (PID incremental / forma de velocidade) + modelo discreto (Z-transform).
     """
 
-    def __init__(self, controler_definitions: dict):
+    def __init__(self, controler_definitions: dict, plant_model: PlantModel = None,
+                 telemetry: Telemetry = None):
 
         self.kp = float(controler_definitions.get("kp", 0.0))
         self.ki = float(controler_definitions.get("ki", 0.0))
@@ -69,6 +73,56 @@ class GenericControler():
         # Estado interno do processo
         self._process_state = 0.0
 
+        # Modelo de processo plugável (None -> FOPDT original calculado no ctrl()).
+        # Se vier das definições ("modelo"), é reconstruído quando k/j/T mudam em tempo
+        # de execução; um plant_model passado pronto é usado como está (ignora k/j/T).
+        self._plant_defs = dict(controler_definitions) if plant_model is None else None
+        self._plant_key = (self.k, self.j, self.T)
+        self.plant_model = plant_model if plant_model is not None else build_plant_model(controler_definitions, self.T)
+
+        # Telemetria opcional: hooks no-op quando desligada
+        self.set_telemetry(telemetry)
+
+
+
+    def set_telemetry(self, telemetry: Telemetry = None):
+        """Liga (ou desliga, com None) a telemetria, religando os hooks usados em ctrl()."""
+        self.telemetry = telemetry
+        self._tm_clock, self._tm_record, self._tm_incr, self._tm_event = bind_hooks(telemetry)
+
+
+
+    def __getstate__(self):
+        # snapshot (pickle/cache) guarda só o estado de controle; telemetria fica de fora
+        state = self.__dict__.copy()
+        for key in ("telemetry", "_tm_clock", "_tm_record", "_tm_incr", "_tm_event"):
+            state.pop(key, None)
+        return state
+
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.set_telemetry(None)
+
+
+
+    def _rebuild_plant_model(self):
+        old = self.plant_model
+        defs = dict(self._plant_defs, k=self.k, j=self.j)
+        self.plant_model = build_plant_model(defs, self.T)
+        self._plant_key = (self.k, self.j, self.T)
+        if self.plant_model is None:
+            return  # segue no FOPDT inline a partir de _process_state
+
+        if old is not None:
+            self.plant_model.transfer_state(old)
+        else:
+            # vindo do FOPDT inline: mantém C(k-1) (estado = C/a_n nos modelos de 1a ordem)
+            base = base_model(self.plant_model)
+            if getattr(base, "a_n", 0.0) != 0.0:
+                base._x = [self._process_state / base.a_n]
+
 
 
     def _update_eta(self):
@@ -79,6 +133,8 @@ class GenericControler():
         if new_eta < 1:
             new_eta = 1
         if new_eta != self._eta:
+            self._tm_incr("eta_resize")
+            self._tm_event("eta_resize", old=self._eta, new=new_eta, tick=self._ticks)
             self._eta = new_eta
             self._m_delay_buf = deque([0.0] * self._eta, maxlen=self._eta)
 
@@ -112,6 +168,8 @@ class GenericControler():
         Executa 1 iteração de controle (PID incremental) e calcula C(k) via modelo discreto.
         """
 
+        t0 = self._tm_clock()
+
         # --- PID incremental ---
         self._e2 = self._e1
         self._e1 = self._e0
@@ -130,18 +188,40 @@ class GenericControler():
             self._m0 = self._m1 + self.action_dir * delta
 
         lim = abs(self.anti_reset_windap)
+        if self._m0 > lim or self._m0 < -lim:
+            self._tm_incr("saturacao")
+            self._tm_event("saturacao", m=self._m0, lim=lim, tick=self._ticks)
         if self._m0 >  lim: self._m0 = float(lim)
         if self._m0 < -lim: self._m0 = -float(lim)
+        self._tm_record("pid", t0)
 
         # Aplica distúrbio na variável manipulada ANTES do cálculo do processo
+        t0 = self._tm_clock()
         disturbio_atual = self._aplicar_disturbio()
         m0_com_disturbio = self._m0 + disturbio_atual
+        self._tm_record("disturbio", t0)
 
         self._m1 = self._m0
         self.vm = round(m0_com_disturbio, 2)  # Agora vm inclui o distúrbio
 
         # --- Z-transform / modelo discreto ---
-        if self.k > 0.0 and self.j > 0.0 and self.T > 0.0:
+        t0 = self._tm_clock()
+        if self._plant_defs is not None and (self.k, self.j, self.T) != self._plant_key:
+            self._rebuild_plant_model()
+
+        plant_base = base_model(self.plant_model) if self.plant_model is not None else None
+        if self.plant_model is not None:
+            # a_n/b_1 só existem nos modelos de 1a ordem (FirstOrder, Integrating)
+            if hasattr(plant_base, "a_n"):
+                self.a_n = plant_base.a_n
+                self.b_1 = plant_base.b_1
+
+            # tempo morto discreto continua no buffer; o modelo recebe m(k-eta)
+            self._update_eta()
+            self._m_delay_buf.append(m0_com_disturbio)
+            self._process_state = self.plant_model.step(self._m_delay_buf[0])
+            ck = self._process_state
+        elif self.k > 0.0 and self.j > 0.0 and self.T > 0.0:
             self.a_n = self.k * (1.0 - math.exp(-self.T / self.j))
             self.b_1 = math.exp(-self.T / self.j)
 
@@ -157,7 +237,10 @@ class GenericControler():
             # fallback simples quando modelo não parametrizado
             ck = m0_com_disturbio
 
+        self._tm_record("planta", t0)
+
         # Fechamento da malha - PV é a saída do processo
+        t0 = self._tm_clock()
         self.pv = ck
 
         # Atualiza as variáveis de estado para o próximo ciclo
@@ -167,7 +250,7 @@ class GenericControler():
         # Incrementa ticks para controle de distúrbio
         self._ticks += 1
 
-        return {
+        out = {
             "sp": self.sp,
             "vm": self.vm,
             "pv": self.pv,
@@ -187,6 +270,11 @@ class GenericControler():
             "disturbio_ativo": self._disturbio_ativo,
             "disturbio_valor": disturbio_atual,
         }
+        if plant_base is not None and not hasattr(plant_base, "a_n"):
+            # modelo sem forma a_n/b_1 (ex.: segunda ordem): mesmas chaves, sem valor falso
+            out["a_n"] = out["b_1"] = None
+        self._tm_record("registro", t0)
+        return out
 
 
 
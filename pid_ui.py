@@ -1,8 +1,15 @@
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk
+from tkinter import messagebox, ttk
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import numpy as np
 from generic_controler import GenericControler
+from comparison import ComparisonBuffers, decimate
+from frequency_analysis import analyze_defs
+from result_cache import ResultCache
+from telemetry import bind_hooks
 
 DEFAULTS = {
     "kp": 0.5,
@@ -29,7 +36,7 @@ def ui2ctrl_action(v: str) -> str:
 
 
 class PIDUI(tk.Tk):
-    def __init__(self, defaults=None):
+    def __init__(self, defaults=None, telemetry=None, cache=None):
         super().__init__()
         self.title("GenericControler - UI Responsiva")
         self.geometry("1400x1200")  # Aumentado de 1000 para 1200
@@ -44,10 +51,26 @@ class PIDUI(tk.Tk):
         self._changing_mode = False
         self._was_running_before_manual = False
 
+        # telemetria opcional (render/tabela aqui; pid/planta/... no controlador)
+        self.telemetry = telemetry
+        self._tm_clock, self._tm_record, self._tm_incr, self._tm_event = bind_hooks(telemetry)
+
+        # cache de simulações completas (criado no primeiro uso); roda em segundo plano
+        self.cache = cache
+        self._sim_queue = queue.Queue()
+        self._sim_pending = 0
+        self._sim_gen = 0             # Reset/Iniciar descartam resultados em andamento
+
+        # modo comparação: execuções em segundo plano -> buffers compartilhados
+        self.comparison = ComparisonBuffers()
+        self._cmp_lines = []          # (linha ck, linha vm) por execução
+        self._cmp_queue = queue.Queue()
+        self._cmp_pending = 0
+
         # controlador
         ctrl_defs = dict(self.defaults)
         ctrl_defs["acao"] = ui2ctrl_action(ctrl_defs.get("acao", "direta"))
-        self.ctrl = GenericControler(ctrl_defs)
+        self.ctrl = GenericControler(ctrl_defs, telemetry=self.telemetry)
 
         # ---- Layout base ----
         self.columnconfigure(0, weight=1)
@@ -153,6 +176,10 @@ class PIDUI(tk.Tk):
         self.btn_pause = ttk.Button(row4, text="Pausar", command=self.toggle_pause)
         self.btn_pause.grid(row=0, column=1, padx=4)
         ttk.Button(row4, text="Reset", command=self.reset).grid(row=0, column=2, padx=4)
+        ttk.Button(row4, text="Simular (cache)", command=self.simulate_cached).grid(row=0, column=4, padx=4)
+        ttk.Button(row4, text="Análise (Bode/Nyquist)", command=self._open_analysis).grid(row=0, column=3, padx=4)
+        ttk.Button(row4, text="Comparar: adicionar", command=self.add_comparison).grid(row=0, column=5, padx=4)
+        ttk.Button(row4, text="Comparar: limpar", command=self.clear_comparison).grid(row=0, column=6, padx=4)
 
 
     def _on_modo_change(self, *args):
@@ -265,12 +292,86 @@ class PIDUI(tk.Tk):
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.get_tk_widget().grid(row=1, column=0, sticky="nsew", padx=8, pady=4)
 
+        # draw_idle() só agenda; o desenho Agg real roda depois em canvas.draw().
+        # Com telemetria ligada, mede esse draw como fase "render".
+        if self.telemetry is not None:
+            draw = self.canvas.draw
+            def timed_draw(*args, **kwargs):
+                t0 = self._tm_clock()
+                try: draw(*args, **kwargs)
+                finally: self._tm_record("render", t0)
+            self.canvas.draw = timed_draw
+
         self.xdata = []
         self.ydata_ck = []
         self.ydata_m1 = []  # Nova lista para dados m1
 
 
 
+    def _open_analysis(self):
+        # Painel de análise em frequência da sintonia atual (sem simular os K passos)
+        win = tk.Toplevel(self)
+        win.title("Análise em frequência"); win.geometry("900x800")
+        win.columnconfigure(0, weight=1); win.rowconfigure(1, weight=1)
+
+        var_info = tk.StringVar(value="")
+        ttk.Label(win, textvariable=var_info, justify="left", padding=8).grid(row=0, column=0, sticky="w")
+
+        fig = Figure(figsize=(6, 7), dpi=100)
+        fig.subplots_adjust(hspace=0.45)
+        ax_mag = fig.add_subplot(311)
+        ax_ph = fig.add_subplot(312)
+        ax_nyq = fig.add_subplot(313)
+        canvas = FigureCanvasTkAgg(fig, master=win)
+        canvas.get_tk_widget().grid(row=1, column=0, sticky="nsew", padx=8, pady=4)
+
+        def refresh():
+            try:
+                defs = self._current_defs()
+            except tk.TclError:
+                return
+            defs["acao"] = ui2ctrl_action(defs.get("acao", "direta"))
+            if defs["k"] <= 0.0 or defs["j"] <= 0.0 or defs["ts"] <= 0.0:
+                var_info.set("Modelo não parametrizado (k, j e ts devem ser > 0)")
+                return
+            try:
+                r = analyze_defs(defs)
+            except ValueError as exc:
+                var_info.set(str(exc))
+                return
+            w = r["w"][0]; L = r["L"][0]
+
+            ax_mag.cla(); ax_ph.cla(); ax_nyq.cla()
+            ax_mag.set_title("Bode - módulo de L(z)"); ax_mag.set_ylabel("dB")
+            ax_mag.semilogx(w, r["mag_db"][0]); ax_mag.axhline(0.0, color="gray", lw=0.8); ax_mag.grid(True, which="both")
+            ax_ph.set_title("Bode - fase de L(z)"); ax_ph.set_ylabel("graus"); ax_ph.set_xlabel("w (rad/s)")
+            ax_ph.semilogx(w, r["phase_deg"][0]); ax_ph.axhline(-180.0, color="gray", lw=0.8); ax_ph.grid(True, which="both")
+            ax_nyq.set_title("Nyquist"); ax_nyq.set_xlabel("Re"); ax_nyq.set_ylabel("Im")
+            ax_nyq.plot(L.real, L.imag); ax_nyq.plot(L.real, -L.imag, ls="--")
+            ax_nyq.plot([-1.0], [0.0], "rx"); ax_nyq.grid(True)
+            # limita a vista perto de -1 (o integrador leva |L| ao infinito em w -> 0)
+            ax_nyq.set_xlim(-4, 2); ax_nyq.set_ylim(-3, 3)
+            canvas.draw_idle()
+
+            verdict = "MARGINAL" if r["marginal"][0] else ("ESTÁVEL" if r["stable"][0] else "INSTÁVEL")
+            if not r["integral"][0]:
+                verdict += " (sem ação integral: offset em regime)"
+            var_info.set(
+                f"a0={r['a0'][0]:.4f}  a1={r['a1'][0]:.4f}  a2={r['a2'][0]:.4f}  |  "
+                f"N={np.round(r['num'][0], 4).tolist()}  D={np.round(r['den'][0], 4).tolist()}  eta={int(r['eta'][0])}\n"
+                f"Margem de ganho: {r['gm_db'][0]:.2f} dB (w={r['w180'][0]:.4f} rad/s)   "
+                f"Margem de fase: {r['pm_deg'][0]:.1f}° (w={r['wc'][0]:.4f} rad/s)\n"
+                f"Banda passante (MF): {r['bandwidth'][0]:.4f} rad/s   "
+                f"Raio espectral: {r['spectral_radius'][0]:.4f} -> "
+                f"{verdict}\n"
+                f"Polos: " + ", ".join(f"{p:.3f}" for p in r["poles"][0] if not np.isnan(p))
+            )
+
+        ttk.Button(win, text="Atualizar", command=refresh).grid(row=2, column=0, pady=(0, 8))
+        refresh()
+
+
+
     def _build_table(self):
         frm = ttk.Frame(self, padding=8); frm.grid(row=2, column=0, sticky="nsew")
         self.rowconfigure(2, weight=1); frm.rowconfigure(0, weight=1); frm.columnconfigure(0, weight=1)
@@ -288,6 +389,15 @@ class PIDUI(tk.Tk):
         self.tree.configure(yscroll=yscroll.set)
         yscroll.grid(row=0, column=1, sticky="ns")
 
+        # Métricas do modo comparação (uma linha por execução)
+        cmp_cols = ["execucao", "IAE", "sobressinal (%)", "acomodacao (s)"]
+        self.tree_cmp = ttk.Treeview(frm, columns=cmp_cols, show="headings", height=8)
+        for c in cmp_cols:
+            self.tree_cmp.heading(c, text=c)
+            self.tree_cmp.column(c, width=110, anchor="center")
+        self.tree_cmp.column("execucao", width=220, anchor="w")
+        self.tree_cmp.grid(row=0, column=2, sticky="nsew", padx=(8, 0))
+
     def _wire_resize(self):
         self.grid_rowconfigure(1, weight=3)  # Gráficos com mais peso
         self.grid_rowconfigure(2, weight=1)  # Tabela com menos peso
@@ -296,6 +406,7 @@ class PIDUI(tk.Tk):
     # ---------- Control flow ----------
     def start(self):
         if self.running: return
+        self._sim_gen += 1
         try: K_limit = int(self.var_K.get())
         except Exception: K_limit = self.ctrl.K
         if self.step_idx >= K_limit:
@@ -339,6 +450,7 @@ class PIDUI(tk.Tk):
 
     def reset(self):
         if self.running: self.stop()
+        self._sim_gen += 1
         self.started = False
         self.reached_K = False
         self.step_idx = 0
@@ -353,7 +465,7 @@ class PIDUI(tk.Tk):
 
         defs = self._current_defs()
         defs["acao"] = ui2ctrl_action(defs.get("acao", "direta"))
-        self.ctrl = GenericControler(defs)  # pv inicial vem daqui; depois não é mais sobrescrito
+        self.ctrl = GenericControler(defs, telemetry=self.telemetry)  # pv inicial vem daqui; depois não é mais sobrescrito
 
         for item in self.tree.get_children():
             self.tree.delete(item)
@@ -361,6 +473,169 @@ class PIDUI(tk.Tk):
         except Exception: pass
 
 
+    def simulate_cached(self):
+        """Roda os K passos de uma vez via ResultCache (em segundo plano) e plota; Iniciar/Retomar continua dali."""
+        self.reset()
+        defs = self._current_defs()
+        defs["acao"] = ui2ctrl_action(defs.get("acao", "direta"))
+        K = defs["K"]
+        if K <= 0:
+            return
+        gen = self._sim_gen
+        cache = self._get_cache()
+
+        def worker():
+            # controlador no estado do passo K, para Iniciar/Retomar continuar sem lacuna
+            try:
+                result = cache.run_with_state(defs, K)
+            except Exception as exc:
+                result = exc
+            self._sim_queue.put((gen, K, result))
+
+        try: self.btn_pause.config(text="Simulando...")
+        except Exception: pass
+        self._sim_pending += 1
+        threading.Thread(target=worker, daemon=True).start()
+        if self._sim_pending == 1:
+            self.after(100, self._poll_simulation)
+
+
+
+    def _poll_simulation(self):
+        # resultado chega da thread; a UI só é tocada aqui (thread do Tk)
+        while True:
+            try: gen, K, result = self._sim_queue.get_nowait()
+            except queue.Empty: break
+            self._sim_pending -= 1
+            if gen != self._sim_gen:
+                continue  # Reset/Iniciar/nova simulação depois do pedido
+            if isinstance(result, Exception):
+                try: self.btn_pause.config(text="Pausar")
+                except Exception: pass
+                messagebox.showerror("Simular (cache)", f"Falha ao simular:\n{result!r}", parent=self)
+                continue
+            self._show_cached_run(K, *result)
+        if self._sim_pending > 0:
+            self.after(100, self._poll_simulation)
+
+
+
+    def _show_cached_run(self, K, traj, ctrl):
+        ctrl.set_telemetry(self.telemetry)
+        self.ctrl = ctrl
+
+        # só o gráfico é preenchido; a tabela/histórico seguem apenas os passos ao vivo
+        self.xdata.extend(range(1, K + 1))
+        self.ydata_ck.extend(traj["ck"].tolist())
+        self.ydata_m1.extend(traj["vm"].tolist())
+        self.line_ck.set_data(self.xdata, self.ydata_ck)
+        self.line_m1.set_data(self.xdata, self.ydata_m1)
+        self.ax_ck.relim(); self.ax_ck.autoscale_view()
+        self.ax_m1.relim(); self.ax_m1.autoscale_view()
+        self.canvas.draw_idle()
+
+        self.step_idx = K
+        self.started = True
+        try: self.btn_pause.config(text="Aumente K p/ retomar")
+        except Exception: pass
+
+
+
+    def _get_cache(self):
+        if self.cache is None:
+            self.cache = ResultCache()
+        return self.cache
+
+
+
+    # ---------- Modo comparação ----------
+    def add_comparison(self):
+        """Simula a configuração atual em segundo plano (via cache) e sobrepõe ao gráfico."""
+        defs = self._current_defs()
+        defs["acao"] = ui2ctrl_action(defs.get("acao", "direta"))
+        if defs["K"] <= 0:
+            return
+        label = f"kp={defs['kp']:g} ki={defs['ki']:g} kd={defs['kd']:g} sp={defs['sp']:g}"
+        cache = self._get_cache()
+
+        def worker():
+            try:
+                traj = cache.run(defs, defs["K"])
+            except Exception as exc:
+                traj = exc
+            self._cmp_queue.put((label, defs, traj))
+
+        self._cmp_pending += 1
+        threading.Thread(target=worker, daemon=True).start()
+        if self._cmp_pending == 1:
+            self.after(100, self._poll_comparison)
+
+
+
+    def _poll_comparison(self):
+        # resultados chegam da thread; a UI só é tocada aqui (thread do Tk)
+        while True:
+            try: label, defs, traj = self._cmp_queue.get_nowait()
+            except queue.Empty: break
+            self._cmp_pending -= 1
+            if isinstance(traj, Exception):
+                messagebox.showerror("Comparação", f"Falha ao simular {label}:\n{traj!r}", parent=self)
+                continue
+            i = self.comparison.add(label, traj, defs["sp"], defs["pv"], defs["ts"])
+            self._plot_comparison_run(i)
+        if self._cmp_pending > 0:
+            self.after(100, self._poll_comparison)
+
+
+
+    def _plot_comparison_run(self, i):
+        n = int(self.comparison.lengths[i])
+        label = self.comparison.labels[i]
+        idx, ck = decimate(self.comparison.ck[i, :n])
+        line_ck, = self.ax_ck.plot(idx + 1, ck, lw=1, alpha=0.8, label=label)
+        idx, vm = decimate(self.comparison.vm[i, :n])
+        line_vm, = self.ax_m1.plot(idx + 1, vm, lw=1, alpha=0.8, color=line_ck.get_color())
+        self._cmp_lines.append((line_ck, line_vm))
+
+        self.ax_ck.legend(handles=[l for l, _ in self._cmp_lines], loc="best", fontsize="small")
+        self.ax_ck.relim(); self.ax_ck.autoscale_view()
+        self.ax_m1.relim(); self.ax_m1.autoscale_view()
+        self.canvas.draw_idle()
+        self._refresh_comparison_metrics()
+
+
+
+    def _refresh_comparison_metrics(self):
+        for item in self.tree_cmp.get_children():
+            self.tree_cmp.delete(item)
+        if self.comparison.n == 0:
+            return
+        m = self.comparison.metrics()
+        for i, label in enumerate(self.comparison.labels):
+            self.tree_cmp.insert("", "end", values=[
+                label,
+                f"{m['iae'][i]:.2f}",
+                f"{m['overshoot'][i]:.1f}",
+                f"{m['settling_time'][i]:.1f}",
+            ])
+
+
+
+    def clear_comparison(self):
+        for line_ck, line_vm in self._cmp_lines:
+            line_ck.remove(); line_vm.remove()
+        self._cmp_lines.clear()
+        self.comparison.clear()
+        legend = self.ax_ck.get_legend()
+        if legend is not None:
+            legend.remove()
+        self.ax_ck.relim(); self.ax_ck.autoscale_view()
+        self.ax_m1.relim(); self.ax_m1.autoscale_view()
+        self.canvas.draw_idle()
+        self._refresh_comparison_metrics()
+
+
+
     def _current_defs(self):
         return {
             "kp": float(self.var_kp.get()),
@@ -402,6 +677,7 @@ class PIDUI(tk.Tk):
         if not self.running:
             return
 
+        t_tick = self._tm_clock()
         self._apply_defs_to_ctrl()
 
         out = self.ctrl.ctrl()
@@ -416,6 +692,7 @@ class PIDUI(tk.Tk):
             except Exception: pass
 
         # Atualiza a série de ck
+        t0 = self._tm_clock()
         y_ck = float(out.get("ck", self.ctrl.vm))
         self.xdata.append(self.step_idx)
         self.ydata_ck.append(y_ck)
@@ -430,8 +707,10 @@ class PIDUI(tk.Tk):
         self.ax_m1.relim(); self.ax_m1.autoscale_view()
 
         self.canvas.draw_idle()
+        self._tm_record("plot", t0)
 
         # Tabela (mantida mínima)
+        t0 = self._tm_clock()
         row = {
             "step": self.step_idx,
             "kp": self.ctrl.kp, 
@@ -455,6 +734,8 @@ class PIDUI(tk.Tk):
         self.history.append(row)
         values = [row[c] for c in ["step","kp","ki","kd","K","modo","acao","sp","ts","pv","anti_reset_windap","vm","m","e0","e1","e2","disturbio_ativo","disturbio_valor"]]
         self.tree.insert("", "end", values=values)
+        self._tm_record("tabela", t0)
+        self._tm_record("tick", t_tick)
 
         # Fechamento da malha está dentro do controller (pv <- self._c0).
 
@@ -0,0 +1,460 @@
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class PlantModel(ABC):
+    """
+    Interface do modelo de processo discreto (planta) usado por GenericControler.ctrl().
+
+    Convenção: a entrada u(k) já chega atrasada pelo buffer de tempo morto do
+    controlador (eta = 1 + floor(tm/T), que inclui o atraso do ZOH), e a saída
+    é calculada após atualizar o estado, como no FOPDT original:
+        C(k) = a_n * m(k-eta) + b_1 * C(k-1)
+
+    step()       -> 1 planta, escalar (float)
+    step_array() -> n plantas independentes em paralelo (np.ndarray de tamanho n)
+    """
+
+    @abstractmethod
+    def step(self, u: float) -> float:
+        raise ValueError("Method not implemented")
+
+    @abstractmethod
+    def step_array(self, u: np.ndarray) -> np.ndarray:
+        raise ValueError("Method not implemented")
+
+    @abstractmethod
+    def reset(self) -> None:
+        raise ValueError("Method not implemented")
+
+    @abstractmethod
+    def reset_array(self, n: int) -> None:
+        raise ValueError("Method not implemented")
+
+    def transfer_state(self, old: "PlantModel") -> None:
+        """Herda o estado escalar de um modelo anterior (reconstrução com k/j/T novos)."""
+        return None
+
+
+
+class StateSpace(PlantModel):
+    """
+    Modelo discreto SISO em espaço de estados:
+        y(k)   = C x(k) + D u(k)
+        x(k+1) = A x(k) + B u(k)
+
+    As matrizes são pré-calculadas no construtor; step() e step_array() não
+    alocam memória por passo (step_array devolve um buffer interno que é
+    sobrescrito na próxima chamada — copie se precisar guardar).
+    """
+
+    def __init__(self, A, B, C, D=0.0):
+        self.A = np.atleast_2d(np.asarray(A, dtype=float))
+        self.B = np.asarray(B, dtype=float).reshape(-1)
+        self.C = np.asarray(C, dtype=float).reshape(-1)
+        self.D = float(D)
+
+        n = self.A.shape[0]
+        if self.A.shape != (n, n) or self.B.shape != (n,) or self.C.shape != (n,):
+            raise ValueError("Dimensões incompatíveis em A, B, C")
+        self.n_states = n
+
+        # versões em listas para o passo escalar (evita overhead do numpy por passo)
+        self._a_rows = self.A.tolist()
+        self._b = self.B.tolist()
+        self._c = self.C.tolist()
+
+        # A transposta contígua para X @ A.T no passo em lote
+        self._At = np.ascontiguousarray(self.A.T)
+
+        self.reset()
+        self._X = None
+
+
+
+    def reset(self) -> None:
+        self._x = [0.0] * self.n_states
+        self._xn = [0.0] * self.n_states
+
+
+
+    def reset_array(self, n: int) -> None:
+        self._X = np.zeros((n, self.n_states))
+        self._Xn = np.zeros((n, self.n_states))
+        self._tmp = np.zeros((n, self.n_states))
+        self._y = np.zeros(n)
+        self._ytmp = np.zeros(n)
+
+
+
+    def transfer_state(self, old: PlantModel) -> None:
+        if isinstance(old, StateSpace) and old.n_states == self.n_states:
+            self._x = list(old._x)
+            self._xn = [0.0] * self.n_states
+
+
+
+    def step(self, u: float) -> float:
+        x = self._x
+        xn = self._xn
+
+        y = self.D * u
+        for ci, xi in zip(self._c, x):
+            y += ci * xi
+
+        for i, row in enumerate(self._a_rows):
+            acc = self._b[i] * u
+            for aij, xj in zip(row, x):
+                acc += aij * xj
+            xn[i] = acc
+
+        # troca os buffers: xn vira o estado atual
+        self._x, self._xn = xn, x
+        return y
+
+
+
+    def step_array(self, u: np.ndarray) -> np.ndarray:
+        if self._X is None or self._X.shape[0] != u.shape[0]:
+            self.reset_array(u.shape[0])
+
+        # y = X C + D u
+        np.matmul(self._X, self.C, out=self._y)
+        np.multiply(u, self.D, out=self._ytmp)
+        self._y += self._ytmp
+
+        # X(k+1) = X A^T + u B^T
+        np.matmul(self._X, self._At, out=self._Xn)
+        np.multiply.outer(u, self.B, out=self._tmp)
+        self._Xn += self._tmp
+
+        self._X, self._Xn = self._Xn, self._X
+        return self._y
+
+
+
+    @classmethod
+    def from_continuous(cls, A, B, C, T: float) -> "StateSpace":
+        """
+        Discretiza (ZOH) um modelo contínuo dx/dt = A x + B u, y = C x e ajusta
+        a saída para a convenção de ctrl() (saída após atualizar o estado):
+            C' = C Ad,  D' = C Bd
+        """
+        A = np.atleast_2d(np.asarray(A, dtype=float))
+        B = np.asarray(B, dtype=float).reshape(-1)
+        C = np.asarray(C, dtype=float).reshape(-1)
+        Ad, Bd = zoh(A, B, T)
+        return cls(Ad, Bd, C @ Ad, float(C @ Bd))
+
+
+
+class TransferFunction(StateSpace):
+    """
+    Função de transferência discreta em z^-1:
+
+        H(z) = (b0 + b1 z^-1 + ... + bn z^-n) / (a0 + a1 z^-1 + ... + an z^-n)
+
+    Realizada na forma canônica controlável (reaproveita o StateSpace).
+    Ex.: o FOPDT do ctrl() é TransferFunction([a_n], [1, -b_1]).
+    """
+
+    def __init__(self, num, den):
+        num = [float(v) for v in num]
+        den = [float(v) for v in den]
+        if not den or den[0] == 0.0:
+            raise ValueError("den[0] deve ser diferente de zero")
+        if len(num) > len(den):
+            raise ValueError("Modelo não causal: len(num) > len(den)")
+
+        # normaliza a0 = 1 e iguala os comprimentos
+        a0 = den[0]
+        num = [v / a0 for v in num] + [0.0] * (len(den) - len(num))
+        den = [v / a0 for v in den]
+
+        self.num = num
+        self.den = den
+
+        n = len(den) - 1
+        b0 = num[0]
+        if n == 0:
+            # ganho estático puro
+            super().__init__([[0.0]], [0.0], [0.0], b0)
+            return
+
+        A = np.zeros((n, n))
+        A[0, :] = [-a for a in den[1:]]
+        if n > 1:
+            A[1:, :-1] = np.eye(n - 1)
+        B = np.zeros(n)
+        B[0] = 1.0
+        C = [num[i + 1] - den[i + 1] * b0 for i in range(n)]
+        super().__init__(A, B, C, b0)
+
+
+
+class FirstOrder(TransferFunction):
+    """
+    Primeira ordem (o FOPDT já usado no ctrl(); o tempo morto fica no buffer eta):
+        a_n = k * (1 - e^(-T/j)),  b_1 = e^(-T/j)
+    """
+
+    def __init__(self, k: float, j: float, T: float):
+        self.k = float(k)
+        self.j = float(j)
+        self.T = float(T)
+        self.b_1 = math.exp(-self.T / self.j)
+        self.a_n = self.k * (1.0 - self.b_1)
+        super().__init__([self.a_n], [1.0, -self.b_1])
+
+
+
+    def transfer_state(self, old: PlantModel) -> None:
+        _transfer_output_state(self, old)
+
+
+
+class SecondOrder(StateSpace):
+    """
+    Segunda ordem contínua discretizada por ZOH:
+        G(s) = k * wn^2 / (s^2 + 2*zeta*wn*s + wn^2)
+    zeta < 1 subamortecido, zeta = 1 crítico, zeta > 1 sobreamortecido.
+    """
+
+    def __init__(self, k: float, wn: float, zeta: float, T: float):
+        self.k = float(k)
+        self.wn = float(wn)
+        self.zeta = float(zeta)
+        self.T = float(T)
+
+        A = np.array([[0.0, 1.0],
+                      [-self.wn ** 2, -2.0 * self.zeta * self.wn]])
+        B = np.array([0.0, self.k * self.wn ** 2])
+        C = np.array([1.0, 0.0])
+        Ad, Bd = zoh(A, B, self.T)
+        super().__init__(Ad, Bd, C @ Ad, float(C @ Bd))
+
+
+
+class Integrating(TransferFunction):
+    """
+    Processo integrador (ex.: nível de tanque): G(s) = k / s
+        C(k) = C(k-1) + k*T * m(k-eta)
+    """
+
+    def __init__(self, k: float, T: float):
+        self.k = float(k)
+        self.T = float(T)
+        self.a_n = self.k * self.T
+        self.b_1 = 1.0
+        super().__init__([self.a_n], [1.0, -self.b_1])
+
+
+
+    def transfer_state(self, old: PlantModel) -> None:
+        _transfer_output_state(self, old)
+
+
+
+class Saturation(PlantModel):
+    """
+    Não-linearidade de saturação na entrada (atuador limitado a [u_min, u_max]).
+    """
+
+    def __init__(self, model: PlantModel, u_min: float, u_max: float):
+        if u_min > u_max:
+            raise ValueError("u_min deve ser <= u_max")
+        self.model = model
+        self.u_min = float(u_min)
+        self.u_max = float(u_max)
+        self._u = None
+
+
+
+    def reset(self) -> None:
+        self.model.reset()
+
+
+
+    def reset_array(self, n: int) -> None:
+        self._u = np.zeros(n)
+        self.model.reset_array(n)
+
+
+
+    def transfer_state(self, old: PlantModel) -> None:
+        self.model.transfer_state(old.model if isinstance(old, Saturation) else old)
+
+
+
+    def step(self, u: float) -> float:
+        if u > self.u_max: u = self.u_max
+        if u < self.u_min: u = self.u_min
+        return self.model.step(u)
+
+
+
+    def step_array(self, u: np.ndarray) -> np.ndarray:
+        if self._u is None or self._u.shape[0] != u.shape[0]:
+            self.reset_array(u.shape[0])
+        np.clip(u, self.u_min, self.u_max, out=self._u)
+        return self.model.step_array(self._u)
+
+
+
+class RateLimit(PlantModel):
+    """
+    Não-linearidade de taxa de variação na entrada: |u(k) - u(k-1)| <= taxa_max * T
+    (taxa_max em unidades por segundo).
+    """
+
+    def __init__(self, model: PlantModel, taxa_max: float, T: float):
+        if taxa_max <= 0.0:
+            raise ValueError("taxa_max deve ser > 0")
+        self.model = model
+        self.taxa_max = float(taxa_max)
+        self.T = float(T)
+        self._du_max = self.taxa_max * self.T
+        self._u_prev = 0.0
+        self._U_prev = None
+
+
+
+    def reset(self) -> None:
+        self._u_prev = 0.0
+        self.model.reset()
+
+
+
+    def reset_array(self, n: int) -> None:
+        self._U_prev = np.zeros(n)
+        self._dU = np.zeros(n)
+        self.model.reset_array(n)
+
+
+
+    def transfer_state(self, old: PlantModel) -> None:
+        if isinstance(old, RateLimit):
+            self._u_prev = old._u_prev
+            old = old.model
+        self.model.transfer_state(old)
+
+
+
+    def step(self, u: float) -> float:
+        du = u - self._u_prev
+        if du >  self._du_max: du =  self._du_max
+        if du < -self._du_max: du = -self._du_max
+        self._u_prev += du
+        return self.model.step(self._u_prev)
+
+
+
+    def step_array(self, u: np.ndarray) -> np.ndarray:
+        if self._U_prev is None or self._U_prev.shape[0] != u.shape[0]:
+            self.reset_array(u.shape[0])
+        np.subtract(u, self._U_prev, out=self._dU)
+        np.clip(self._dU, -self._du_max, self._du_max, out=self._dU)
+        self._U_prev += self._dU
+        return self.model.step_array(self._U_prev)
+
+
+
+def _transfer_output_state(new, old) -> None:
+    # Na realização de [a_n] / [1, -b_1] o estado vale C(k-1) / a_n; preserva C(k-1)
+    # (como o _process_state do FOPDT inline) mesmo quando k/j/T mudam a_n.
+    if isinstance(old, (FirstOrder, Integrating)) and old.a_n != 0.0 and new.a_n != 0.0:
+        new._x = [old._x[0] * old.a_n / new.a_n]
+        new._xn = [0.0]
+
+
+
+def base_model(model: PlantModel) -> PlantModel:
+    """Modelo linear por baixo dos wrappers de não-linearidade (Saturation/RateLimit)."""
+    while isinstance(model, (Saturation, RateLimit)):
+        model = model.model
+    return model
+
+
+
+def zoh(A: np.ndarray, B: np.ndarray, T: float):
+    """
+    Discretização por segurador de ordem zero:
+        exp([[A, B], [0, 0]] * T) = [[Ad, Bd], [0, 1]]
+    """
+    n = A.shape[0]
+    M = np.zeros((n + 1, n + 1))
+    M[:n, :n] = A
+    M[:n, n] = B
+    E = _expm(M * T)
+    return E[:n, :n].copy(), E[:n, n].copy()
+
+
+
+def _expm(M: np.ndarray) -> np.ndarray:
+    # scaling and squaring + série de Taylor (matrizes pequenas, sem scipy)
+    norm = np.linalg.norm(M, ord=np.inf)
+    s = max(0, int(math.ceil(math.log2(norm))) + 1) if norm > 0.5 else 0
+    Ms = M / (2 ** s)
+
+    E = np.eye(M.shape[0])
+    term = np.eye(M.shape[0])
+    for i in range(1, 20):
+        term = term @ Ms / i
+        E = E + term
+    for _ in range(s):
+        E = E @ E
+    return E
+
+
+
+def build_plant_model(controler_definitions: dict, T: float):
+    """
+    Cria o modelo de processo a partir do dict de definições (chave "modelo").
+    Retorna None para "primeira_ordem" sem não-linearidades, mantendo o
+    cálculo original (a_n, b_1) dentro do ctrl(). Com não-linearidades e k/j
+    não parametrizados, usa ganho unitário (o mesmo fallback ck = m do ctrl())
+    para que saturação/limite de taxa nunca sejam descartados.
+
+    Chaves:
+        modelo:   "primeira_ordem" | "segunda_ordem" | "integrador"
+        k, j:     ganho e constante de tempo (primeira ordem)
+        wn, zeta: frequência natural e amortecimento (segunda ordem)
+        u_min, u_max: saturação da entrada
+        taxa_max: limite de taxa da entrada (unid/s)
+    """
+    modelo = str(controler_definitions.get("modelo", "primeira_ordem"))
+    k = float(controler_definitions.get("k", 0.0))
+    u_min = controler_definitions.get("u_min")
+    u_max = controler_definitions.get("u_max")
+    taxa_max = controler_definitions.get("taxa_max")
+    has_nonlinear = u_min is not None or u_max is not None or taxa_max is not None
+
+    if modelo == "primeira_ordem" and not has_nonlinear:
+        return None
+    if T <= 0.0:
+        raise ValueError("ts deve ser > 0 para o modelo de processo discreto")
+
+    if modelo == "primeira_ordem":
+        j = float(controler_definitions.get("j", 0.0))
+        if k > 0.0 and j > 0.0:
+            model = FirstOrder(k, j, T)
+        else:
+            model = TransferFunction([1.0], [1.0])
+    elif modelo == "segunda_ordem":
+        wn = float(controler_definitions.get("wn", 1.0))
+        zeta = float(controler_definitions.get("zeta", 1.0))
+        model = SecondOrder(k, wn, zeta, T)
+    elif modelo == "integrador":
+        model = Integrating(k, T)
+    else:
+        raise ValueError(f"Modelo de processo desconhecido: {modelo}")
+
+    if taxa_max is not None:
+        model = RateLimit(model, float(taxa_max), T)
+    if u_min is not None or u_max is not None:
+        lo = float(u_min) if u_min is not None else -math.inf
+        hi = float(u_max) if u_max is not None else math.inf
+        model = Saturation(model, lo, hi)
+    return model
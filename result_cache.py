@@ -0,0 +1,272 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+import generic_controler
+import plant_models
+from generic_controler import GenericControler
+from plant_models import PlantModel
+
+
+# Séries gravadas por passo (mesmas chaves do dict retornado por ctrl())
+TRAJECTORY_FIELDS = ("ck", "vm", "pv", "m", "e0", "disturbio_valor")
+
+# Incrementar quando o formato das entradas mudar
+CACHE_SCHEMA = 1
+
+# Erros ao ler uma entrada apagada, corrompida ou gravada por outra versão do código
+# (pickle de GenericControler antigo, .npy truncado, ...): tratada como miss
+CACHE_ERRORS = (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError,
+                pickle.UnpicklingError)
+
+
+
+def _code_fingerprint() -> str:
+    # o resultado depende do código de ctrl()/PlantModel/simulate: qualquer mudança invalida o cache
+    h = hashlib.sha256()
+    for module_file in (generic_controler.__file__, plant_models.__file__, __file__):
+        with open(module_file, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+CODE_FINGERPRINT = _code_fingerprint()
+
+
+
+def simulate(controler_definitions: dict, K: int, ctrl: GenericControler = None,
+             plant_model: PlantModel = None):
+    """
+    Roda K passos de ctrl() e devolve (trajetórias, controlador no estado final).
+    Se ctrl for dado, continua a partir do estado dele; senão cria um novo com
+    uma cópia de plant_model (o modelo do chamador não é alterado).
+    """
+    if ctrl is None:
+        ctrl = GenericControler(controler_definitions,
+                                plant_model=copy.deepcopy(plant_model) if plant_model is not None else None)
+
+    traj = {f: np.empty(K) for f in TRAJECTORY_FIELDS}
+    for i in range(K):
+        out = ctrl.ctrl()
+        for f in TRAJECTORY_FIELDS:
+            traj[f][i] = out[f]
+    return traj, ctrl
+
+
+
+class ResultCache():
+    """
+    Cache em disco, endereçado por conteúdo, de simulações completas.
+
+    Chave = sha256(definições sem "K" + cenário + plant_model + versão do
+    código) + K. Cada entrada é um diretório <hash>_<K>/ com uma .npy por série
+    (lida com mmap) e o snapshot do controlador no passo K (state.pkl).
+
+    - hit exato ou com K maior já gravado: devolve memmaps (fatiados em K)
+    - K cresceu: retoma do snapshot do maior K menor e simula só a diferença
+    - LRU: o mtime do diretório marca o último uso; os mais antigos são
+      removidos quando o total passa de max_bytes
+
+    cenario: dict JSON-serializável com informações extras do experimento que
+    devam separar entradas. plant_model: modelo pronto passado ao
+    GenericControler; entra na chave pelo hash do seu pickle.
+
+    Pode ser usado de várias threads: leitura/gravação/remoção das entradas
+    ficam sob um lock (a simulação em si roda fora dele). Entre processos, a
+    publicação é atômica (rename) e entradas que somem viram miss.
+    """
+
+    def __init__(self, path: str = ".pid_cache", max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+
+
+
+    @staticmethod
+    def config_hash(controler_definitions: dict, cenario: dict = None,
+                    plant_model: PlantModel = None) -> str:
+        defs = {k: v for k, v in controler_definitions.items() if k != "K"}
+        plant = None
+        if plant_model is not None:
+            plant = hashlib.sha256(pickle.dumps(plant_model, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        payload = json.dumps({
+            "schema": CACHE_SCHEMA,
+            "codigo": CODE_FINGERPRINT,
+            "defs": defs,
+            "cenario": cenario,
+            "plant_model": plant,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+
+    def _entries(self, h: str):
+        """[(K, dir)] já gravados para o hash, em ordem de K."""
+        found = []
+        prefix = h + "_"
+        for name in os.listdir(self.path):
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                found.append((int(name[len(prefix):]), os.path.join(self.path, name)))
+        return sorted(found)
+
+
+
+    def _load(self, entry_dir: str, K: int) -> dict:
+        os.utime(entry_dir)  # marca uso (LRU)
+        return {
+            f: np.load(os.path.join(entry_dir, f + ".npy"), mmap_mode="r")[:K]
+            for f in TRAJECTORY_FIELDS
+        }
+
+
+
+    def _load_state(self, entry_dir: str) -> GenericControler:
+        with open(os.path.join(entry_dir, "state.pkl"), "rb") as f:
+            return pickle.load(f)
+
+
+
+    def _readable(self, entry_dir: str) -> bool:
+        try:
+            for f in TRAJECTORY_FIELDS:
+                np.load(os.path.join(entry_dir, f + ".npy"), mmap_mode="r")
+            self._load_state(entry_dir)
+        except CACHE_ERRORS:
+            return False
+        return True
+
+
+
+    def get(self, controler_definitions: dict, K: int, cenario: dict = None,
+            plant_model: PlantModel = None):
+        """Trajetórias (memmap) dos K primeiros passos, ou None se não houver entrada >= K."""
+        for k_saved, entry_dir in self._entries(self.config_hash(controler_definitions, cenario, plant_model)):
+            if k_saved >= K:
+                try:
+                    return self._load(entry_dir, K)
+                except CACHE_ERRORS:
+                    continue
+        return None
+
+
+
+    def run(self, controler_definitions: dict, K: int, cenario: dict = None,
+            plant_model: PlantModel = None) -> dict:
+        """Devolve as trajetórias de K passos, do cache quando possível."""
+        return self._run(controler_definitions, K, cenario, plant_model, need_state=False)[0]
+
+
+
+    def run_with_state(self, controler_definitions: dict, K: int, cenario: dict = None,
+                       plant_model: PlantModel = None):
+        """
+        (trajetórias, controlador no estado do passo K). Uma entrada maior que K
+        não serve aqui (não há snapshot em K): retoma do maior K menor e grava K.
+        """
+        return self._run(controler_definitions, K, cenario, plant_model, need_state=True)
+
+
+
+    def _run(self, controler_definitions, K, cenario, plant_model, need_state):
+        K = int(K)
+        h = self.config_hash(controler_definitions, cenario, plant_model)
+
+        # maior K primeiro; entradas ilegíveis são ignoradas (caem na simulação)
+        resume = None
+        with self._lock:
+            for k_saved, entry_dir in reversed(self._entries(h)):
+                try:
+                    if k_saved == K:
+                        return self._load(entry_dir, K), (self._load_state(entry_dir) if need_state else None)
+                    if k_saved > K:
+                        if not need_state:
+                            return self._load(entry_dir, K), None
+                        continue
+                    resume = (k_saved, self._load_state(entry_dir), self._load(entry_dir, k_saved))
+                    break
+                except CACHE_ERRORS:
+                    continue
+
+        # retoma do maior K já gravado (se houver) em vez de simular do passo 0
+        if resume is not None:
+            k_prev, ctrl, prev = resume
+            tail, ctrl = simulate(controler_definitions, K - k_prev, ctrl)
+            traj = {f: np.concatenate([prev[f], tail[f]]) for f in TRAJECTORY_FIELDS}
+        else:
+            traj, ctrl = simulate(controler_definitions, K, plant_model=plant_model)
+
+        with self._lock:
+            entry_dir = self._store(h, K, traj, ctrl)
+            try:
+                return self._load(entry_dir, K), ctrl
+            except CACHE_ERRORS:
+                return traj, ctrl
+
+
+
+    def _store(self, h: str, K: int, traj: dict, ctrl: GenericControler) -> str:
+        # chamado com self._lock adquirido
+        entry_dir = os.path.join(self.path, f"{h}_{K}")
+        tmp_dir = tempfile.mkdtemp(prefix=f"{h}_{K}.tmp", dir=self.path)
+        for f in TRAJECTORY_FIELDS:
+            np.save(os.path.join(tmp_dir, f + ".npy"), np.asarray(traj[f]))
+        with open(os.path.join(tmp_dir, "state.pkl"), "wb") as f:
+            pickle.dump(ctrl, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # publica de forma atômica (outro processo pode ter gravado a mesma chave);
+        # uma entrada já existente mas ilegível é substituída, senão seria relida sempre
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            if not self._readable(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            try:
+                os.rename(tmp_dir, entry_dir)
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self._evict(keep=entry_dir)
+        return entry_dir
+
+
+
+    def _evict(self, keep: str = None) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.path):
+            d = os.path.join(self.path, name)
+            if ".tmp" in name:
+                continue
+            try:
+                if not os.path.isdir(d):
+                    continue
+                size = sum(os.path.getsize(os.path.join(d, f)) for f in os.listdir(d))
+                mtime = os.path.getmtime(d)
+            except OSError:
+                continue  # removida por outro processo no meio da varredura
+            entries.append((mtime, size, d))
+            total += size
+
+        for _, size, d in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if d == keep:
+                continue
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+
+
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in os.listdir(self.path):
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
@@ -1,4 +1,25 @@
+import os
+
+from dotenv import load_dotenv
+
 from pid_ui import PIDUI
+from telemetry import Telemetry
+
+
+def env_flag(name: str) -> bool:
+    # só valores explícitos ligam: PID_TELEMETRY=0/false/vazio continua desligado
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on", "sim")
+
 
 if __name__ == '__main__':
-    PIDUI().mainloop()
\ No newline at end of file
+    load_dotenv()
+
+    # PID_TELEMETRY=1 liga a instrumentação; PID_TELEMETRY_PORT expõe /metrics e /json
+    telemetry = Telemetry() if env_flag("PID_TELEMETRY") else None
+    if telemetry is not None and os.getenv("PID_TELEMETRY_PORT"):
+        telemetry.serve(int(os.getenv("PID_TELEMETRY_PORT")))
+
+    PIDUI(telemetry=telemetry).mainloop()
+
+    if telemetry is not None:
+        telemetry.export(os.getenv("PID_TELEMETRY_FILE", "telemetry.prom"))
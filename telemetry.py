@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Telemetry():
+    """
+    Instrumentação opcional do ctrl() e do PIDUI._tick:
+      - timers por fase (pid, disturbio, planta, registro, plot, render, tabela, tick)
+        "plot" = set_data/relim no _tick; "render" = desenho Agg real do canvas
+        (executado depois, no idle do Tk, fora do "tick")
+      - contadores (saturacao, eta_resize, ...)
+      - log de eventos em ring buffer (deque com maxlen)
+
+    Exporta em texto Prometheus ou JSON, para arquivo ou via HTTP local.
+    Quando desligada (telemetry=None), os hooks ligados no construtor são no-op.
+    """
+
+    def __init__(self, log_size: int = 1024, clock=time.perf_counter):
+        self.clock = clock
+        self.timers = {}            # fase -> [chamadas, total_s, max_s]
+        self.counters = {}          # nome -> contagem
+        self.events = deque(maxlen=log_size)
+
+
+
+    def record(self, phase: str, t0: float) -> None:
+        """Acumula o tempo decorrido desde t0 (obtido via self.clock()) na fase."""
+        dt = self.clock() - t0
+        timer = self.timers.get(phase)
+        if timer is None:
+            timer = self.timers[phase] = [0, 0.0, 0.0]
+        timer[0] += 1
+        timer[1] += dt
+        if dt > timer[2]:
+            timer[2] = dt
+
+
+
+    def incr(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+
+
+    def event(self, name: str, **fields) -> None:
+        self.events.append((time.time(), name, fields))
+
+
+
+    def reset(self) -> None:
+        self.timers.clear()
+        self.counters.clear()
+        self.events.clear()
+
+
+
+    def to_dict(self) -> dict:
+        # cópias rasas primeiro (atômicas sob o GIL), pois o endpoint HTTP lê de outra thread
+        timers = dict(self.timers)
+        counters = dict(self.counters)
+        events = list(self.events)
+        return {
+            "timers": {
+                phase: {"calls": c, "total_s": tot, "max_s": mx}
+                for phase, (c, tot, mx) in timers.items()
+            },
+            "counters": counters,
+            "events": [
+                {"ts": ts, "name": name, **fields}
+                for ts, name, fields in events
+            ],
+        }
+
+
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+
+
+    def to_prometheus(self) -> str:
+        data = self.to_dict()
+        lines = [
+            "# TYPE pid_phase_calls_total counter",
+            *[f'pid_phase_calls_total{{phase="{p}"}} {t["calls"]}' for p, t in data["timers"].items()],
+            "# TYPE pid_phase_seconds_total counter",
+            *[f'pid_phase_seconds_total{{phase="{p}"}} {t["total_s"]:.9f}' for p, t in data["timers"].items()],
+            "# TYPE pid_phase_seconds_max gauge",
+            *[f'pid_phase_seconds_max{{phase="{p}"}} {t["max_s"]:.9f}' for p, t in data["timers"].items()],
+            "# TYPE pid_events_total counter",
+            *[f'pid_events_total{{name="{n}"}} {c}' for n, c in data["counters"].items()],
+        ]
+        return "\n".join(lines) + "\n"
+
+
+
+    def export(self, path: str) -> None:
+        """Grava em JSON se o arquivo terminar em .json, senão em texto Prometheus."""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Sobe um endpoint local em thread daemon:
+            /metrics -> texto Prometheus
+            /json    -> JSON
+        """
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/json"):
+                    body, ctype = telemetry.to_json(), "application/json"
+                elif self.path.startswith("/metrics"):
+                    body, ctype = telemetry.to_prometheus(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+
+def _noop_clock() -> float:
+    return 0.0
+
+
+
+def _noop(*args, **kwargs) -> None:
+    return None
+
+
+
+def bind_hooks(telemetry: Telemetry = None):
+    """
+    Retorna (clock, record, incr, event) ligados à telemetria, ou no-ops quando
+    telemetry é None. Feito uma vez no construtor para não testar flag por passo.
+    """
+    if telemetry is None:
+        return _noop_clock, _noop, _noop, _noop
+    return telemetry.clock, telemetry.record, telemetry.incr, telemetry.event
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from comparison import ComparisonBuffers, decimate, step_metrics
+
+
+nan = np.nan
+
+# degrau 0 -> 1 com sobressinal, degrau 0 -> 1 que não acomoda (execução mais curta)
+# e degrau 2 -> 0 (descendente) com ts = 1
+CK = np.array([
+    [0.0, 0.5, 1.2, 0.9, 1.0, 1.01, 1.0],
+    [0.0, 0.5, 0.8, nan, nan, nan, nan],
+    [2.0, 1.0, -0.5, 0.0, 0.0, 0.0, 0.0],
+])
+SP = np.array([1.0, 1.0, 0.0])
+PV0 = np.array([0.0, 0.0, 2.0])
+TS = np.array([0.5, 0.5, 1.0])
+
+
+def test_step_metrics_hand_computed():
+    m = step_metrics(CK, SP, PV0, TS)
+    # |e| = [1, .5, .2, .1, 0, .01, 0] * 0.5 ; [1, .5, .2] * 0.5 ; [2, 1, .5, 0...] * 1
+    np.testing.assert_allclose(m["iae"], [0.905, 0.85, 3.5])
+    np.testing.assert_allclose(m["overshoot"], [20.0, 0.0, 25.0])
+    # último passo fora da faixa de 2%: índice 3 (0.9) e índice 2 (-0.5)
+    np.testing.assert_allclose(m["settling_time"], [2.0, nan, 3.0])
+
+
+def test_step_metrics_scalar_arguments():
+    m = step_metrics(CK[0], 1.0, 0.0, 0.5)
+    assert m["iae"].shape == (1,)
+    assert m["overshoot"][0] == pytest.approx(20.0)
+    assert m["settling_time"][0] == pytest.approx(2.0)
+
+
+def test_buffers_metrics_match_step_metrics():
+    buf = ComparisonBuffers(capacity=1, K=2)
+    for i in range(3):
+        n = int(np.sum(~np.isnan(CK[i])))
+        buf.add(f"r{i}", {"ck": CK[i, :n], "vm": np.zeros(n)}, SP[i], PV0[i], TS[i])
+    ref = step_metrics(CK, SP, PV0, TS)
+    for key, values in buf.metrics().items():
+        np.testing.assert_allclose(values, ref[key])
+
+
+def test_decimate_keeps_extremes():
+    y = np.sin(np.linspace(0.0, 20.0, 10001))
+    y[1234] = 5.0
+    y[8765] = -5.0
+    idx, yd = decimate(y, max_points=200)
+    assert len(idx) <= 210
+    assert np.all(np.diff(idx) > 0)
+    assert yd.max() == 5.0 and yd.min() == -5.0
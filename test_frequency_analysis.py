@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from frequency_analysis import analyze, analyze_defs
+from result_cache import simulate
+
+
+PLANT = {"k": 1.0, "j": 3.0, "tm": 2.0, "ts": 0.5, "sp": 1.0, "pv": 0.0,
+         "modo": "automatico", "acao": "inversa"}
+
+
+def _simulation_settles(defs, K=2000):
+    ck = simulate(defs, K)[0]["ck"]
+    return bool(np.all(np.isfinite(ck)) and np.ptp(ck[-200:]) < 1e-6)
+
+
+@pytest.mark.parametrize("kp, ki, kd", [
+    (0.3, 0.0, 0.0),
+    (0.5, 0.0, 0.0),
+    (1.0, 0.0, 0.0),
+    (3.0, 0.0, 0.0),
+    (1.0, 0.3, 0.1),
+    (2.0, 1.0, 0.2),
+    (5.0, 2.0, 0.0),
+])
+def test_stability_matches_simulation(kp, ki, kd):
+    defs = dict(PLANT, kp=kp, ki=ki, kd=kd)
+    r = analyze_defs(defs)
+    assert bool(r["stable"][0]) == _simulation_settles(defs)
+
+
+def test_p_only_cancels_integrator_root():
+    r = analyze_defs(dict(PLANT, kp=0.5))
+    assert not r["integral"][0]
+    assert not r["marginal"][0]
+    assert r["spectral_radius"][0] < 0.9
+    # o polo em z = 1 da forma velocidade não aparece
+    poles = r["poles"][0]
+    assert np.all(np.abs(poles[~np.isnan(poles)] - 1.0) > 1e-3)
+
+
+def test_batch_matches_single():
+    kp = np.array([0.5, 1.0, 2.0])
+    ki = np.array([0.0, 0.3, 1.0])
+    batch = analyze(kp, ki, 0.0, 1.0, 3.0, 2.0, 0.5, acao="inversa")
+    for i in range(kp.size):
+        single = analyze(kp[i], ki[i], 0.0, 1.0, 3.0, 2.0, 0.5, acao="inversa")
+        assert batch["spectral_radius"][i] == pytest.approx(single["spectral_radius"][0])
+        assert batch["stable"][i] == single["stable"][0]
+
+
+def test_manual_mode_is_refused():
+    with pytest.raises(ValueError):
+        analyze_defs(dict(PLANT, kp=1.0, modo="manual"))
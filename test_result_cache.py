@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+
+from result_cache import TRAJECTORY_FIELDS, ResultCache, simulate
+
+
+DEFS = {"kp": 1.0, "ki": 0.3, "kd": 0.1, "k": 1.0, "j": 3.0, "tm": 2.0, "ts": 0.5,
+        "sp": 1.0, "pv": 0.0, "modo": "automatico", "acao": "inversa"}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "cache"))
+
+
+def _assert_same(traj, ref):
+    for f in TRAJECTORY_FIELDS:
+        assert np.array_equal(np.asarray(traj[f]), ref[f]), f
+
+
+@pytest.mark.parametrize("steps", [(50, 120), (30, 80, 200)])
+def test_resumed_run_is_bit_identical(cache, steps):
+    for K in steps:
+        traj = cache.run(DEFS, K)
+        _assert_same(traj, simulate(DEFS, K)[0])
+
+
+def test_exact_and_shorter_hits(cache):
+    cache.run(DEFS, 100)
+    ref = simulate(DEFS, 100)[0]
+    _assert_same(cache.get(DEFS, 100), ref)
+    _assert_same(cache.run(DEFS, 40), {f: ref[f][:40] for f in TRAJECTORY_FIELDS})
+
+
+def test_run_with_state_continues_like_fresh(cache):
+    cache.run(DEFS, 200)
+    traj, ctrl = cache.run_with_state(DEFS, 50)
+    tail, _ = simulate(DEFS, 30, ctrl)
+
+    ref = simulate(DEFS, 80)[0]
+    _assert_same(traj, {f: ref[f][:50] for f in TRAJECTORY_FIELDS})
+    _assert_same(tail, {f: ref[f][50:] for f in TRAJECTORY_FIELDS})
+
+
+def test_unreadable_entry_is_replaced(cache):
+    cache.run_with_state(DEFS, 60)
+    (_, entry_dir), = cache._entries(cache.config_hash(DEFS))
+    for name in ("ck.npy", "state.pkl"):
+        with open(os.path.join(entry_dir, name), "wb") as f:
+            f.write(b"corrompido")
+
+    traj, _ = cache.run_with_state(DEFS, 60)
+    _assert_same(traj, simulate(DEFS, 60)[0])
+    _assert_same(cache.get(DEFS, 60), simulate(DEFS, 60)[0])